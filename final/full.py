@@ -1,10 +1,21 @@
 import base64
+import hashlib
+import heapq
 import requests
+import numpy as np
 import pandas as pd
-from typing import List, Dict
+from typing import List, Dict, Tuple
 from pathlib import Path
+from functools import lru_cache
+from collections import Counter
+from itertools import chain
+from concurrent.futures import ThreadPoolExecutor
 import json
-import ast
+import os
+import re
+import sys
+import tempfile
+import time
 from datetime import datetime
 
 SYSTEM_PROMPT = """You are a fragrance recognition system. Analyze cologne bottles and output a JSON response with:
@@ -25,13 +36,55 @@ USER_PROMPT = """Analyze this image and return a JSON object with cologne bottle
     ]
 }"""
 
-def encode_image(image_path: str) -> str:
+BATCH_PROMPT = """Analyze these images and return a JSON object with the cologne bottles identified in each, one entry per image in the order the images were given. Format:
+{
+    "images": [
+        {
+            "colognes": [
+                {
+                    "brand": "Brand name",
+                    "name": "Fragrance name",
+                    "confidence": 0.95,
+                    "bottle_location": "left/center/right"
+                }
+            ]
+        }
+    ]
+}"""
+
+def encode_image(image_path: str, prefix: bytes = b"") -> str:
+    # Encode in chunks (a multiple of 3 bytes, so no padding mid-stream), read
+    # into one reused chunk buffer and written straight into an output buffer
+    # sized up front for prefix + the whole encoded image
     with open(image_path, "rb") as image_file:
-        return base64.b64encode(image_file.read()).decode('utf-8')
+        size = os.fstat(image_file.fileno()).st_size
+        encoded = bytearray(len(prefix) + 4 * ((size + 2) // 3))
+        encoded[:len(prefix)] = prefix
+        chunk = bytearray(57 * 1024)
+        chunk_view = memoryview(chunk)
+        position = len(prefix)
+        while read := image_file.readinto(chunk):
+            piece = base64.b64encode(chunk_view[:read])
+            # In place while it fits; grows the buffer if the file got longer
+            # after it was sized
+            encoded[position:position + len(piece)] = piece
+            position += len(piece)
+        chunk_view.release()
+    # Only shrinks if the file got shorter while we read it
+    del encoded[position:]
+    return encoded.decode('ascii')
 
-def analyze_image(image_path: str, api_key: str) -> dict:
-    base64_image = encode_image(image_path)
-    
+def _image_content(image_path: str) -> dict:
+    return {
+        "type": "image_url",
+        "image_url": {
+            # The data URL is built in encode_image's buffer, not by copying
+            # the encoded image into a new string
+            "url": encode_image(image_path, prefix=b"data:image/jpeg;base64,")
+        }
+    }
+
+def _chat_completion(content: List[dict], api_key: str, session: requests.Session = None, max_tokens: int = 300) -> dict:
     headers = {
         "Content-Type": "application/json",
         "Authorization": f"Bearer {api_key}"
@@ -41,24 +94,14 @@ def analyze_image(image_path: str, api_key: str) -> dict:
         "model": "gpt-4o-mini",
         "messages": [
             {"role": "system", "content": SYSTEM_PROMPT},
-            {
-                "role": "user",
-                "content": [
-                    {"type": "text", "text": USER_PROMPT},
-                    {
-                        "type": "image_url",
-                        "image_url": {
-                            "url": f"data:image/jpeg;base64,{base64_image}"
-                        }
-                    }
-                ]
-            }
+            {"role": "user", "content": content}
         ],
-        "max_tokens": 300,
+        "max_tokens": max_tokens,
         "response_format": { "type": "json_object" }
     }
     
-    response = requests.post(
+    # Reuse the caller's session (and its open connection) when given one
+    response = (session or requests).post(
         "https://api.openai.com/v1/chat/completions",
         headers=headers,
         json=payload
@@ -70,8 +113,44 @@ def analyze_image(image_path: str, api_key: str) -> dict:
         
     return json.loads(json_response["choices"][0]["message"]["content"])
 
-def get_weather(api_key: str, city: str = "Austin") -> Dict:
-    """Get current weather data from OpenWeatherMap"""
+def analyze_image(image_path: str, api_key: str, session: requests.Session = None) -> dict:
+    return _chat_completion(
+        [{"type": "text", "text": USER_PROMPT}, _image_content(image_path)],
+        api_key,
+        session
+    )
+
+def _is_detection(cologne) -> bool:
+    return (
+        isinstance(cologne, dict)
+        and isinstance(cologne.get('brand'), str)
+        and isinstance(cologne.get('name'), str)
+        and 'confidence' in cologne
+    )
+
+def analyze_image_batch(image_paths: List[str], api_key: str, session: requests.Session = None) -> List[dict]:
+    """Analyze several images in one request; returns one analyze_image-style result per image, in order"""
+    result = _chat_completion(
+        [{"type": "text", "text": BATCH_PROMPT}] + [_image_content(path) for path in image_paths],
+        api_key,
+        session,
+        max_tokens=300 * len(image_paths)
+    )
+    images = result.get('images') if isinstance(result, dict) else None
+    if not isinstance(images, list) or len(images) != len(image_paths):
+        count = len(images) if isinstance(images, list) else 'no list'
+        raise ValueError(f"Expected results for {len(image_paths)} images, got {count}")
+    # Callers fall back to per-image requests on ValueError, so any reply the
+    # matcher couldn't read is reported as one rather than failing the batch
+    for image in images:
+        colognes = image.get('colognes') if isinstance(image, dict) else None
+        if not isinstance(colognes, list) or not all(_is_detection(cologne) for cologne in colognes):
+            raise ValueError(f"Malformed image result: {image!r}")
+    return images
+
+@lru_cache(maxsize=32)
+def _fetch_weather(api_key: str, city: str, time_bucket: int) -> Dict:
+    # time_bucket only feeds the cache key, so entries expire when it rolls over
     url = f"http://api.openweathermap.org/data/2.5/weather?q={city}&appid={api_key}&units=imperial"
     response = requests.get(url)
     data = response.json()
@@ -79,150 +158,214 @@ def get_weather(api_key: str, city: str = "Austin") -> Dict:
     return {
         'temp': data['main']['temp'],
         'humidity': data['main']['humidity'],
-        'condition': data['weather'][0]['main'].lower(),
-        'time_of_day': 'day' if 6 <= datetime.now().hour < 18 else 'night'
+        'condition': data['weather'][0]['main'].lower()
     }
 
+def get_weather(api_key: str, city: str = "Austin", ttl: int = 120) -> Dict:
+    """Get current weather data from OpenWeatherMap, cached for up to `ttl` seconds"""
+    weather = dict(_fetch_weather(api_key, city, int(time.time() // ttl)))
+    # Taken on every call, so a cached reading never carries a stale day/night
+    weather['time_of_day'] = 'day' if 6 <= datetime.now().hour < 18 else 'night'
+    return weather
+
+@lru_cache(maxsize=None)
+def _parse_list(value: str) -> Tuple[str, ...]:
+    """Parse a "['a', 'b']" cell as written by raw_data/cleaner.py (memoized, many rows repeat)
+
+    Tokens are interned so the same accord/note is one shared string object
+    everywhere, and dict/set lookups on it short-circuit on identity.
+    """
+    return tuple(sys.intern(item.strip().strip("'")) for item in value.strip('[]').split(','))
+
+# Columns the recognizer and recommenders actually read
+DB_COLUMNS = ['brand', 'perfume', 'accords', 'notes', 'value', 'season', 'occasion']
+
+# Accords the weather rules look for (substring match on the raw accords text)
+WEATHER_ACCORDS = ['spicy', 'oriental', 'fresh', 'citrus', 'aquatic', 'woody']
+
+def _add_derived_columns(cologne_db: pd.DataFrame) -> None:
+    cologne_db['accords_parsed'] = cologne_db['accords'].map(_parse_list)
+    cologne_db['notes_parsed'] = cologne_db['notes'].map(_parse_list)
+    
+    # Evaluate the accord tests once per cologne so weather scoring is boolean arithmetic
+    accords = cologne_db['accords'].str.lower()
+    for accord in WEATHER_ACCORDS:
+        cologne_db[f'has_{accord}'] = accords.str.contains(accord, regex=False)
+
+CACHE_DIR = Path('.cache/full')
+# Bump when _add_derived_columns or _parse_list change what a loaded frame holds
+DB_CACHE_VERSION = 1
+
+@lru_cache(maxsize=4)
+def _load_database(database_path: str, mtime_ns: int, size: int) -> pd.DataFrame:
+    # mtime_ns/size only feed the cache keys, so an edited CSV is parsed afresh;
+    # otherwise the parsed frame (derived columns included) comes from a pickle
+    # on disk, or from memory on repeat loads within a process
+    key = repr((DB_CACHE_VERSION, DB_COLUMNS, WEATHER_ACCORDS, os.path.abspath(database_path), mtime_ns, size)).encode()
+    cache_file = CACHE_DIR / f"{hashlib.sha256(key).hexdigest()}.pkl"
+    if cache_file.exists():
+        try:
+            return pd.read_pickle(cache_file)
+        except Exception:
+            # Unreadable, or pickled by another pandas/numpy version: rebuild it
+            pass
+    
+    # Only load the columns we use; brand/season/occasion repeat a small set of
+    # values, so store them as categories (int codes instead of Python strings)
+    cologne_db = pd.read_csv(
+        database_path,
+        usecols=DB_COLUMNS,
+        dtype={'brand': 'category', 'season': 'category', 'occasion': 'category'}
+    )
+    _add_derived_columns(cologne_db)
+    
+    # Written to a temporary file first, so an interrupted write never leaves
+    # a truncated cache behind
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    with tempfile.NamedTemporaryFile(dir=CACHE_DIR, suffix='.tmp', delete=False) as tmp:
+        cologne_db.to_pickle(tmp)
+    os.replace(tmp.name, cache_file)
+    return cologne_db
+
+def load_database(database_path: str) -> pd.DataFrame:
+    """Load the cologne database CSV with its derived columns, parsing it only when it changed"""
+    stat = os.stat(database_path)
+    # Copied so callers can't modify the cached frame
+    return _load_database(database_path, stat.st_mtime_ns, stat.st_size).copy()
+
+def _build_membership(token_lists: List[List[str]]) -> Tuple[Dict[str, int], np.ndarray]:
+    """Build a (rows x vocab) 0/1 membership matrix from per-row token lists"""
+    vocab = {}
+    for tokens in token_lists:
+        for token in tokens:
+            vocab.setdefault(token, len(vocab))
+    
+    matrix = np.zeros((len(token_lists), len(vocab)))
+    for row, tokens in enumerate(token_lists):
+        matrix[row, [vocab[token] for token in tokens]] = 1.0
+    return vocab, matrix
+
+def _profile_vector(vocab: Dict[str, int], keys) -> np.ndarray:
+    vector = np.zeros(len(vocab))
+    vector[[vocab[key] for key in keys if key in vocab]] = 1.0
+    return vector
+
 class CologneRecommender:
     def __init__(self, cologne_db: pd.DataFrame):
         self.cologne_db = cologne_db
         
-    def _calculate_weather_score(self, cologne: pd.Series, weather: Dict) -> float:
-        score = 0.0
-        accords = cologne['accords'].lower()
+        # Tokenize every cologne's accords/notes once so purchase scoring is a matrix product
+        accord_lists = [[sys.intern(a.lower()) for a in x] for x in cologne_db['accords_parsed']]
+        note_lists = [[sys.intern(n.lower()) for n in x] for x in cologne_db['notes_parsed']]
+        self._accord_vocab, self._accord_matrix = _build_membership(accord_lists)
+        self._note_vocab, self._note_matrix = _build_membership(note_lists)
+        self._accord_counts = np.array([len(a) for a in accord_lists], dtype=float)
+        self._note_counts = np.array([len(n) for n in note_lists], dtype=float)
+        
+        # Flat column arrays the purchase filter and scorer read directly
+        self._perfume_lc = cologne_db['perfume'].str.lower()
+        self._value = cologne_db['value'].to_numpy(dtype=float)
+        self._season = cologne_db['season'].to_numpy()
+        self._occasion = cologne_db['occasion'].to_numpy()
+        
+    def _calculate_weather_scores(self, colognes: pd.DataFrame, weather: Dict) -> pd.Series:
+        score = pd.Series(0.0, index=colognes.index)
         
         # Temperature scoring
         if weather['temp'] < 60:
-            if cologne['season'] in ['fall', 'winter']:
-                score += 1.0
-            if 'spicy' in accords or 'oriental' in accords:
-                score += 0.5
+            score += 1.0 * colognes['season'].isin(['fall', 'winter'])
+            score += 0.5 * (colognes['has_spicy'] | colognes['has_oriental'])
         elif weather['temp'] > 80:
-            if cologne['season'] in ['spring', 'summer']:
-                score += 1.0
-            if 'fresh' in accords or 'citrus' in accords:
-                score += 0.5
+            score += 1.0 * colognes['season'].isin(['spring', 'summer'])
+            score += 0.5 * (colognes['has_fresh'] | colognes['has_citrus'])
         else:
             score += 0.5
             
         # Weather condition scoring
         if weather['condition'] == 'rain':
-            if 'aquatic' in accords or 'fresh' in accords:
-                score += 0.5
+            score += 0.5 * (colognes['has_aquatic'] | colognes['has_fresh'])
         elif weather['condition'] in ['clear', 'clouds']:
-            if 'citrus' in accords or 'fresh' in accords:
-                score += 0.5
+            score += 0.5 * (colognes['has_citrus'] | colognes['has_fresh'])
                 
         if weather['time_of_day'] == 'night':
-            if 'spicy' in accords or 'woody' in accords or 'oriental' in accords:
-                score += 0.5
+            score += 0.5 * (colognes['has_spicy'] | colognes['has_woody'] | colognes['has_oriental'])
                 
         return score
         
-    def _calculate_occasion_score(self, cologne: pd.Series, occasion: str) -> float:
-        return 1.0 if cologne['occasion'] == occasion else 0.0
+    def _calculate_occasion_scores(self, colognes: pd.DataFrame, occasion: str) -> pd.Series:
+        return 1.0 * (colognes['occasion'] == occasion)
         
-    def recommend(self, collection: List[Dict], weather: Dict, occasion: str) -> Dict:
-        best_score = -1
+    def recommend(self, collection: pd.DataFrame, weather: Dict, occasion: str) -> Dict:
         recommendation = None
         
-        for cologne in collection:
-            cologne_series = pd.Series(cologne)
-            weather_score = self._calculate_weather_score(cologne_series, weather)
-            occasion_score = self._calculate_occasion_score(cologne_series, occasion)
-            total_score = weather_score + occasion_score
-            
-            if total_score > best_score:
-                best_score = total_score
-                recommendation = cologne
+        # Score the whole collection at once; argmax keeps the first of any ties
+        if not collection.empty:
+            total_score = self._calculate_weather_scores(collection, weather) + self._calculate_occasion_scores(collection, occasion)
+            recommendation = collection.iloc[int(np.argmax(total_score.to_numpy()))].to_dict()
                 
         return {
             'recommendation': recommendation,
             'reasoning': f"Selected based on {weather['temp']}°F temperature, {weather['condition']} conditions, and {occasion} occasion."
         }
 
-    def _get_collection_profile(self, collection: List[Dict]) -> Dict:
-        # Analyze the collection's characteristics
-        all_accords = []
-        all_notes = []
-        seasons = []
-        occasions = []
-        
-        for cologne in collection:
-            accords = cologne['accords'].strip('[]').split(',')
-            all_accords.extend([a.strip().strip("'") for a in accords])
-            
-            notes = cologne['notes'].strip('[]').split(',')
-            all_notes.extend([n.strip().strip("'") for n in notes])
-            
-            seasons.append(cologne['season'])
-            occasions.append(cologne['occasion'])
-            
+    def _get_collection_profile(self, collection: pd.DataFrame) -> Dict:
+        # Analyze the collection's characteristics, one column at a time.
+        # Counter is plenty for a collection-sized list; value_counts adds overhead here
         return {
-            'common_accords': pd.Series(all_accords).value_counts().to_dict(),
-            'common_notes': pd.Series(all_notes).value_counts().to_dict(),
-            'seasons': pd.Series(seasons).value_counts().to_dict(),
-            'occasions': pd.Series(occasions).value_counts().to_dict()
+            'common_accords': Counter(chain.from_iterable(collection['accords_parsed'])),
+            'common_notes': Counter(chain.from_iterable(collection['notes_parsed'])),
+            'seasons': Counter(collection['season']),
+            'occasions': Counter(collection['occasion'])
         }
 
-    def recommend_new_purchase(self, collection: List[Dict], want_similar: bool, budget: float = None) -> Dict:
+    def recommend_new_purchase(self, collection: pd.DataFrame, want_similar: bool, budget: float = None) -> Dict:
         profile = self._get_collection_profile(collection)
         
+        # Build a single availability mask, then score only the colognes that pass it
+        collection_names = collection['perfume'].str.lower().tolist()
+        # Remove colognes already in collection
+        available = ~self._perfume_lc.isin(collection_names).to_numpy()
         # Filter by budget if specified
-        available_colognes = self.cologne_db
         if budget:
-            available_colognes = available_colognes[available_colognes['value'] * 100 <= budget]
-            
-        # Remove colognes already in collection and similar named ones
-        collection_names = [c['perfume'].lower() for c in collection]
-        collection_brands = [c['brand'].lower() for c in collection]
-        available_colognes = available_colognes[~available_colognes['perfume'].str.lower().isin(collection_names)]
+            available &= self._value * 100 <= budget
         # Remove variants of same fragrance (e.g., if you have Sauvage Elixir, remove all Sauvage versions)
-        available_colognes = available_colognes[~available_colognes['perfume'].str.lower().apply(
-            lambda x: any(name.split()[0] in x for name in collection_names)
-        )]
+        first_words = {name.split()[0] for name in collection_names}
+        if first_words:
+            variant_pattern = re.compile('|'.join(re.escape(word) for word in first_words))
+            available &= ~self._perfume_lc.str.contains(variant_pattern).to_numpy(dtype=bool)
+        rows = np.flatnonzero(available)
         
-        scores = []
-        for _, cologne in available_colognes.iterrows():
-            cologne_accords = cologne['accords'].strip('[]').split(',')
-            cologne_accords = [a.strip().strip("'").lower() for a in cologne_accords]
-            
-            cologne_notes = cologne['notes'].strip('[]').split(',')
-            cologne_notes = [n.strip().strip("'").lower() for n in cologne_notes]
-            
-            # Calculate similarity scores
-            accord_similarity = len(set(cologne_accords) & set(profile['common_accords'].keys())) / len(cologne_accords)
-            note_similarity = len(set(cologne_notes) & set(profile['common_notes'].keys())) / len(cologne_notes)
-            season_similarity = 1.0 if cologne['season'] in profile['seasons'] else 0.0
-            occasion_similarity = 1.0 if cologne['occasion'] in profile['occasions'] else 0.0
+        # Calculate similarity scores for the remaining colognes at once
+        accord_similarity = self._accord_matrix[rows] @ _profile_vector(self._accord_vocab, profile['common_accords']) / self._accord_counts[rows]
+        note_similarity = self._note_matrix[rows] @ _profile_vector(self._note_vocab, profile['common_notes']) / self._note_counts[rows]
+        seasons = self._season[rows]
+        occasions = self._occasion[rows]
+        
+        if want_similar:
+            season_similarity = np.isin(seasons, list(profile['seasons'])).astype(float)
+            occasion_similarity = np.isin(occasions, list(profile['occasions'])).astype(float)
+            scores = (accord_similarity + note_similarity + season_similarity + occasion_similarity) / 4
+        else:
+            # For different recommendations, prefer:
+            # - Different seasons than most common in collection
+            # - Different occasions
+            # - Different accords/notes profile
+            common_season = profile['seasons'].most_common(1)[0][0]
+            common_occasion = profile['occasions'].most_common(1)[0][0]
             
-            if want_similar:
-                total_score = (accord_similarity + note_similarity + season_similarity + occasion_similarity) / 4
-            else:
-                # For different recommendations, prefer:
-                # - Different seasons than most common in collection
-                # - Different occasions
-                # - Different accords/notes profile
-                common_season = max(profile['seasons'].items(), key=lambda x: x[1])[0]
-                common_occasion = max(profile['occasions'].items(), key=lambda x: x[1])[0]
-                
-                season_difference = 0.0 if cologne['season'] == common_season else 1.0
-                occasion_difference = 0.0 if cologne['occasion'] == common_occasion else 1.0
-                accord_difference = 1 - accord_similarity
-                note_difference = 1 - note_similarity
-                
-                total_score = (accord_difference + note_difference + season_difference + occasion_difference) / 4
+            season_difference = (seasons != common_season).astype(float)
+            occasion_difference = (occasions != common_occasion).astype(float)
+            accord_difference = 1 - accord_similarity
+            note_difference = 1 - note_similarity
             
-            scores.append((total_score, cologne))
+            scores = (accord_difference + note_difference + season_difference + occasion_difference) / 4
             
-        # Sort by score
-        scores.sort(key=lambda x: x[0], reverse=True)
-        
-        # Get top 3 recommendations
+        # Get top 3 recommendations; nlargest keeps database order among ties like a stable sort
+        top = rows[heapq.nlargest(3, range(len(rows)), key=scores.__getitem__)]
         recommendations = []
         reasons = []
         
-        for _, cologne in scores[:3]:
+        for cologne in self.cologne_db.iloc[top].to_dict('records'):
             recommendations.append({
                 'brand': cologne['brand'],
                 'name': cologne['perfume'],
@@ -244,38 +387,71 @@ class CologneRecommender:
 
 class CologneRecognizer:
     def __init__(self, database_path: str):
-        self.cologne_db = pd.read_csv(database_path)
+        self.cologne_db = load_database(database_path)
         self.api_key = None
         self.recommender = CologneRecommender(self.cologne_db)
+        self._session = requests.Session()
+        
+        # Lowercased once so matching each detection is a vectorized substring search
+        self._brand_lc = self.cologne_db['brand'].str.lower().to_numpy(dtype=str)
+        self._perfume_lc = self.cologne_db['perfume'].str.lower().to_numpy(dtype=str)
+        self._brand_masks = {}
 
-    def analyze_image(self, image_path: str) -> List[Dict]:
-        result = analyze_image(image_path, self.api_key)
+    def analyze_image(self, image_path: str) -> pd.DataFrame:
+        result = analyze_image(image_path, self.api_key, self._session)
         return self._match_with_database(result['colognes'])
 
-    def _match_with_database(self, detected_colognes: List[Dict]) -> List[Dict]:
-        matched_colognes = []
+    def analyze_images(self, image_paths: List[str], max_workers: int = 8, batch_size: int = 4) -> pd.DataFrame:
+        """Analyze several photos and return the combined collection
+
+        Photos are sent batch_size to a request (sharing the prompt and round
+        trip), with the batches themselves running concurrently.
+        """
+        batches = [image_paths[i:i + batch_size] for i in range(0, len(image_paths), batch_size)]
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            results = list(chain.from_iterable(executor.map(self._analyze_batch, batches)))
+        return pd.concat(results) if results else self._match_with_database([])
+
+    def _analyze_batch(self, image_paths: List[str]) -> List[pd.DataFrame]:
+        if len(image_paths) > 1:
+            try:
+                results = analyze_image_batch(image_paths, self.api_key, self._session)
+                return [self._match_with_database(result['colognes']) for result in results]
+            except ValueError:
+                # The reply didn't line up with the images; ask about each one on its own
+                pass
+        return [self.analyze_image(path) for path in image_paths]
+
+    def _brand_mask(self, brand: str) -> np.ndarray:
+        # Several bottles in a photo often share a brand, so keep each brand's mask around
+        mask = self._brand_masks.get(brand)
+        if mask is None:
+            mask = np.zeros(len(self._brand_lc), dtype=bool)
+            for term in brand.split():
+                mask |= np.char.find(self._brand_lc, term) >= 0
+            self._brand_masks[brand] = mask
+        return mask
+
+    def _match_with_database(self, detected_colognes: List[Dict]) -> pd.DataFrame:
+        """Return the matched database rows (one per recognized bottle) as a DataFrame"""
+        rows = []
+        confidences = []
+        locations = []
         
         for cologne in detected_colognes:
-            brand_terms = cologne['brand'].lower().split()
-            brand_match = self.cologne_db['brand'].str.lower().apply(
-                lambda x: any(term in x for term in brand_terms)
-            )
-            
-            name_match = self.cologne_db['perfume'].str.contains(
-                cologne['name'], case=False, regex=False
-            )
+            brand_match = self._brand_mask(cologne['brand'].lower())
+            name_match = np.char.find(self._perfume_lc, cologne['name'].lower()) >= 0
             
-            match = self.cologne_db[brand_match & name_match]
+            match = np.flatnonzero(brand_match & name_match)
             
-            if not match.empty:
-                cologne_data = match.iloc[0].to_dict()
-                cologne_data['confidence'] = cologne['confidence']
-                cologne_data['bottle_location'] = cologne.get('bottle_location', '')
-                matched_colognes.append(cologne_data)
+            if len(match):
+                rows.append(match[0])
+                confidences.append(cologne['confidence'])
+                locations.append(cologne.get('bottle_location', ''))
         
-        return matched_colognes
+        return self.cologne_db.iloc[rows].assign(confidence=confidences, bottle_location=locations)
 
-    def get_recommendation(self, collection: List[Dict], weather: Dict, occasion: str) -> Dict:
+    def get_recommendation(self, collection: pd.DataFrame, weather: Dict, occasion: str) -> Dict:
         return self.recommender.recommend(collection, weather, occasion)
 
 if __name__ == "__main__":
@@ -297,12 +473,12 @@ if __name__ == "__main__":
             break
         print("Invalid choice. Please enter 1 or 2.")
     
-    # Get collection from image
-    image_path = input("Enter path to cologne image: ")
-    collection = recognizer.analyze_image(image_path)
+    # Get collection from one or more images
+    image_paths = input("Enter path(s) to cologne image(s), comma separated: ").split(',')
+    collection = recognizer.analyze_images([path.strip() for path in image_paths])
     
     print("\nRecognized Collection:")
-    for cologne in collection:
+    for cologne in collection.to_dict('records'):
         print(f"\nBrand: {cologne['brand']}")
         print(f"Name: {cologne['perfume']}")
         print(f"Confidence: {cologne['confidence']:.2%}")
@@ -1,33 +1,54 @@
+import heapq
+import sys
+import numpy as np
 import pandas as pd
 import networkx as nx
 import matplotlib.pyplot as plt
 from ast import literal_eval
+from functools import lru_cache
+
+@lru_cache(maxsize=None)
+def parse_list(value):
+    # Cells look like "['a', 'b']"; parse each distinct string only once and
+    # intern the tokens so every node name is a single shared string object
+    return tuple(sys.intern(item.strip().strip("'")) for item in value.strip('[]').split(','))
 
 def create_fragrance_network(csv_path):
     # Load data
     df = pd.read_csv(csv_path)
+    df['accords_parsed'] = df['accords'].map(parse_list)
+    df['notes_parsed'] = df['notes'].map(parse_list)
     
     # Create network
     G = nx.Graph()
     
     # Add fragrance nodes
-    for _, row in df.iterrows():
-        G.add_node(row['perfume'], type='fragrance', brand=row['brand'])
-        
-        # Add accord edges
-        accords = [a.strip().strip("'") for a in row['accords'].strip('[]').split(',')]
-        for accord in accords:
-            G.add_node(accord, type='accord')
-            G.add_edge(row['perfume'], accord, type='has_accord')
-            
-        # Add note edges
-        notes = [n.strip().strip("'") for n in row['notes'].strip('[]').split(',')]
-        for note in notes:
-            G.add_node(note, type='note')
-            G.add_edge(row['perfume'], note, type='has_note')
+    G.add_nodes_from(
+        (perfume, {'type': 'fragrance', 'brand': brand})
+        for perfume, brand in zip(df['perfume'], df['brand'])
+    )
+    
+    # Add accord/note nodes and edges from one long (perfume, token, type) table.
+    # Kept in row order so a token listed as both an accord and a note ends up
+    # with whichever type it was last seen as, same as adding them row by row.
+    accords = df[['perfume', 'accords_parsed']].explode('accords_parsed').set_axis(['perfume', 'token'], axis=1)
+    accords['type'] = 'accord'
+    notes = df[['perfume', 'notes_parsed']].explode('notes_parsed').set_axis(['perfume', 'token'], axis=1)
+    notes['type'] = 'note'
+    tokens = pd.concat([accords, notes]).sort_index(kind='stable')
+    
+    token_types = tokens.groupby('token', sort=False)['type'].last()
+    G.add_nodes_from((token, {'type': kind}) for token, kind in token_types.items())
+    G.add_edges_from(
+        (perfume, token, {'type': f'has_{kind}'})
+        for perfume, token, kind in tokens.itertuples(index=False, name=None)
+    )
     
     return G
 
+def nodes_of_type(G, node_type):
+    return [n for n, t in G.nodes(data='type') if t == node_type]
+
 def analyze_network(G):
     # Basic metrics
     print(f"Network Stats:")
@@ -35,34 +56,72 @@ def analyze_network(G):
     print(f"Edges: {G.number_of_edges()}")
     
     # Most common notes/accords
-    note_nodes = [n for n, d in G.nodes(data=True) if d.get('type') == 'note']
-    accord_nodes = [n for n, d in G.nodes(data=True) if d.get('type') == 'accord']
-    
+    # One degree view per node type; nlargest keeps graph order among ties
     print("\nMost Connected Notes:")
-    note_degrees = sorted([(n, G.degree(n)) for n in note_nodes], key=lambda x: x[1], reverse=True)[:5]
+    note_degrees = heapq.nlargest(5, G.degree(nodes_of_type(G, 'note')), key=lambda x: x[1])
     for note, degree in note_degrees:
         print(f"{note}: {degree} connections")
         
     print("\nMost Connected Accords:")
-    accord_degrees = sorted([(a, G.degree(a)) for a in accord_nodes], key=lambda x: x[1], reverse=True)[:5]
+    accord_degrees = heapq.nlargest(5, G.degree(nodes_of_type(G, 'accord')), key=lambda x: x[1])
     for accord, degree in accord_degrees:
         print(f"{accord}: {degree} connections")
     
-    # Find communities
-    communities = list(nx.community.greedy_modularity_communities(G))
+    # Find communities with Louvain on the fragrance-fragrance projection
+    communities = nx.community.louvain_communities(project_fragrances(G), weight='weight', seed=0)
     print(f"\nFound {len(communities)} distinct fragrance communities")
     
     return communities
 
+def incidence_matrix(G, rows, token_type):
+    # 0/1 matrix of which tokens (notes or accords) each row's fragrance links to
+    tokens = nodes_of_type(G, token_type)
+    column = {token: j for j, token in enumerate(tokens)}
+    
+    M = np.zeros((len(rows), len(tokens)))
+    for i, node in enumerate(rows):
+        M[i, [column[n] for n in G.neighbors(node) if n in column]] = 1.0
+    return M
+
+def jaccard_to_row(M, idx):
+    # Jaccard similarity of every row against row idx in one matrix-vector product
+    intersect = M @ M[idx]
+    sizes = M.sum(axis=1)
+    return intersect / (sizes + sizes[idx] - intersect)
+
+def project_fragrances(G):
+    # Fragrance-fragrance graph, weighted by how many notes/accords each pair shares
+    fragrances = nodes_of_type(G, 'fragrance')
+    M = np.hstack([incidence_matrix(G, fragrances, 'note'), incidence_matrix(G, fragrances, 'accord')])
+    shared = np.triu(M @ M.T, k=1)
+    
+    P = nx.Graph()
+    P.add_nodes_from(fragrances)
+    rows, cols = np.nonzero(shared)
+    P.add_weighted_edges_from((fragrances[i], fragrances[j], shared[i, j]) for i, j in zip(rows, cols))
+    return P
+
+def find_similar_fragrances(G, fragrance_name, top_n=5):
+    fragrances = nodes_of_type(G, 'fragrance')
+    idx = fragrances.index(fragrance_name)
+    
+    note_similarity = jaccard_to_row(incidence_matrix(G, fragrances, 'note'), idx)
+    accord_similarity = jaccard_to_row(incidence_matrix(G, fragrances, 'accord'), idx)
+    similarity = (note_similarity + accord_similarity) / 2
+    
+    # Stable sort so ties keep graph order; skip the query fragrance itself
+    ranked = [i for i in np.argsort(-similarity, kind='stable') if i != idx][:top_n]
+    return [(fragrances[i], similarity[i]) for i in ranked]
+
 def visualize_network(G, communities=None):
     pos = nx.spring_layout(G)
     
     plt.figure(figsize=(15, 15))
     
     # Draw nodes by type
-    fragrances = [n for n, d in G.nodes(data=True) if d.get('type') == 'fragrance']
-    notes = [n for n, d in G.nodes(data=True) if d.get('type') == 'note']
-    accords = [n for n, d in G.nodes(data=True) if d.get('type') == 'accord']
+    fragrances = nodes_of_type(G, 'fragrance')
+    notes = nodes_of_type(G, 'note')
+    accords = nodes_of_type(G, 'accord')
     
     nx.draw_networkx_nodes(G, pos, nodelist=fragrances, node_color='lightblue', node_size=100)
     nx.draw_networkx_nodes(G, pos, nodelist=notes, node_color='lightgreen', node_size=50)
@@ -81,20 +140,6 @@ if __name__ == "__main__":
     # Find similar fragrances
     fragrance_name = "Sauvage Elixir"  # Example
     if fragrance_name in G:
-        similar = []
-        fragrance_notes = set(n for n in G.neighbors(fragrance_name) if G.nodes[n]['type'] == 'note')
-        fragrance_accords = set(a for a in G.neighbors(fragrance_name) if G.nodes[a]['type'] == 'accord')
-        
-        for node in G.nodes():
-            if G.nodes[node]['type'] == 'fragrance' and node != fragrance_name:
-                node_notes = set(n for n in G.neighbors(node) if G.nodes[n]['type'] == 'note')
-                node_accords = set(a for a in G.neighbors(node) if G.nodes[a]['type'] == 'accord')
-                
-                note_similarity = len(fragrance_notes & node_notes) / len(fragrance_notes | node_notes)
-                accord_similarity = len(fragrance_accords & node_accords) / len(fragrance_accords | node_accords)
-                
-                similar.append((node, (note_similarity + accord_similarity) / 2))
-        
         print(f"\nMost similar to {fragrance_name}:")
-        for fragrance, similarity in sorted(similar, key=lambda x: x[1], reverse=True)[:5]:
+        for fragrance, similarity in find_similar_fragrances(G, fragrance_name):
             print(f"{fragrance}: {similarity:.2f} similarity")
\ No newline at end of file
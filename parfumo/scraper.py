@@ -1,21 +1,72 @@
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import TimeoutException
-import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
+import lxml.html
+from lxml import etree
+import requests
+import threading
+import csv
 import time
 import json
+import re
 import logging
 from typing import List, Dict
 
-class ParfumoSeleniumScraper:
-    def __init__(self):
+class RateLimiter:
+    """Token bucket shared by all worker threads of a scraper."""
+
+    def __init__(self, rate: float, capacity: int = 1):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a request may be sent."""
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens < 1:
+                time.sleep((1 - self.tokens) / self.rate)
+                self.updated = time.monotonic()
+                self.tokens = 0.0
+            else:
+                self.tokens -= 1
+
+class ParfumoScraper:
+    RATING_MAPPING = {
+        'Scent': 'scent_rating',
+        'Longevity': 'longevity_rating',
+        'Sillage': 'sillage_rating',
+        'Bottle': 'bottle_rating',
+        'Value for money': 'valueformoney_rating'
+    }
+    # Fixed CSV header: pages missing a rating just leave that column empty
+    FIELDNAMES = [
+        'brand_name', 'perfume_name', 'main_accords', 'fragrance_notes',
+        'season', 'occasion', *RATING_MAPPING.values()
+    ]
+    # XPath expressions compiled once and reused for every page
+    LISTING_XPATH = etree.XPath("//*[contains(@class, 'perfume')]")
+    BRAND_XPATH = etree.XPath("//*[contains(@class, 'brand')]")
+    NAME_XPATH = etree.XPath("//*[contains(@class, 'name')]")
+    ACCORD_XPATH = etree.XPath("//*[contains(@class, 'accord')]")
+    NOTE_XPATH = etree.XPath("//*[contains(@class, 'note')]")
+    RATING_XPATHS = {
+        label_text: etree.XPath(f"//div[contains(text(), '{label_text}')]/..//div[contains(@class, 'rating-value')]")
+        for label_text in RATING_MAPPING
+    }
+    CHART_PATTERNS = {
+        chart_name: re.compile(rf"window\.{chart_name}\s*=\s*(\[.*?\]);", re.DOTALL)
+        for chart_name in ('seasonData', 'occasionData')
+    }
+
+    def __init__(self, max_workers: int = 8, requests_per_second: float = 1.0):
         self.base_url = "https://www.parfumo.com"
+        self.max_workers = max_workers
+        self.rate_limiter = RateLimiter(requests_per_second)
         self.setup_logging()
-        self.setup_driver()
+        self.setup_session()
 
     def setup_logging(self):
         logging.basicConfig(
@@ -23,88 +74,73 @@ class ParfumoSeleniumScraper:
             format='%(asctime)s - %(levelname)s - %(message)s'
         )
 
-    def setup_driver(self):
-        """Configure and start Chrome webdriver"""
-        chrome_options = Options()
-        chrome_options.add_argument("--headless")  # Run in headless mode
-        chrome_options.add_argument("--no-sandbox")
-        chrome_options.add_argument("--disable-dev-shm-usage")
-        chrome_options.add_argument("--disable-gpu")
-        chrome_options.add_argument("--window-size=1920,1080")
-        chrome_options.add_argument("--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36")
-        
-        self.driver = webdriver.Chrome(options=chrome_options)
-        self.wait = WebDriverWait(self.driver, 10)
+    def setup_session(self):
+        """Configure a keep-alive HTTP session shared by all fetches"""
+        self.session = requests.Session()
+        self.session.headers.update({
+            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+        })
+
+    def fetch(self, url: str) -> str:
+        """Fetches a page's HTML, respecting the shared rate limit."""
+        self.rate_limiter.acquire()
+        response = self.session.get(url, timeout=10)
+        response.raise_for_status()
+        return response.text
 
     def get_cologne_urls(self) -> List[str]:
         """Scrapes the top 100 men's cologne URLs from the main page."""
         try:
-            self.driver.get(f"{self.base_url}/Perfumes/Tops/Men")
-            logging.info("Waiting for perfume listings to load...")
-            
-            # Wait for perfume items to be visible
-            perfume_items = self.wait.until(
-                EC.presence_of_all_elements_located((By.CSS_SELECTOR, ".perfume-listing-item, .perfume-item, [class*='perfume']"))
-            )
-            
+            url = f"{self.base_url}/Perfumes/Tops/Men"
+            tree = lxml.html.fromstring(self.fetch(url), base_url=url)
+            tree.make_links_absolute()
+
             cologne_links = []
-            for item in perfume_items:
-                try:
-                    link = item.find_element(By.TAG_NAME, "a")
-                    href = link.get_attribute("href")
-                    if href and '/Perfumes/' in href:
-                        cologne_links.append(href)
-                        logging.info(f"Found cologne URL: {href}")
-                except Exception as e:
-                    logging.warning(f"Error extracting link from item: {str(e)}")
-            
+            for item in self.LISTING_XPATH(tree):
+                link = item.find(".//a")
+                href = link.get("href") if link is not None else None
+                # Nested listing elements repeat the same link; keep the first one
+                if href and '/Perfumes/' in href and href not in cologne_links:
+                    cologne_links.append(href)
+                    logging.info(f"Found cologne URL: {href}")
+
             return cologne_links[:100]
-            
+
         except Exception as e:
             logging.error(f"Error fetching cologne URLs: {str(e)}")
             return []
 
-    def extract_ratings(self, wait) -> Dict:
+    def extract_ratings(self, tree) -> Dict:
         """Extracts various ratings from the cologne page."""
         ratings = {}
         try:
-            rating_mapping = {
-                'Scent': 'scent_rating',
-                'Longevity': 'longevity_rating',
-                'Sillage': 'sillage_rating',
-                'Bottle': 'bottle_rating',
-                'Value for money': 'valueformoney_rating'
-            }
-            
-            for label_text, rating_key in rating_mapping.items():
+            for label_text, rating_key in self.RATING_MAPPING.items():
                 try:
-                    # Wait for rating elements to be visible
-                    rating_element = wait.until(
-                        EC.presence_of_element_located((By.XPATH, f"//div[contains(text(), '{label_text}')]/..//div[contains(@class, 'rating-value')]"))
-                    )
-                    value = float(rating_element.text.strip())
+                    rating_element = self.RATING_XPATHS[label_text](tree)[0]
+                    value = float(rating_element.text_content().strip())
                     ratings[rating_key] = value
-                except (TimeoutException, ValueError) as e:
+                except (IndexError, ValueError) as e:
                     logging.warning(f"Could not find or parse rating for {label_text}: {str(e)}")
-                    
+
         except Exception as e:
             logging.error(f"Error extracting ratings: {str(e)}")
-            
+
         return ratings
 
-    def extract_pie_chart_data(self, driver, chart_name: str) -> str:
+    def extract_pie_chart_data(self, html: str, chart_name: str) -> str:
         """Extracts the highest percentage category from a pie chart."""
         try:
-            # Execute JavaScript to get the chart data
-            script = f"return window.{chart_name};"
-            chart_data = driver.execute_script(script)
-            
+            # The chart data is assigned to window.<chart_name> in an inline script
+            pattern = self.CHART_PATTERNS.get(chart_name) or re.compile(rf"window\.{chart_name}\s*=\s*(\[.*?\]);", re.DOTALL)
+            match = pattern.search(html)
+            chart_data = json.loads(match.group(1)) if match else None
+
             if chart_data:
                 max_item = max(chart_data, key=lambda x: x.get('percentage', 0))
                 return max_item.get('label')
-                
+
             return None
-            
+
         except Exception as e:
             logging.error(f"Error extracting pie chart data for {chart_name}: {str(e)}")
             return None
@@ -112,44 +148,29 @@ class ParfumoSeleniumScraper:
     def scrape_cologne_details(self, url: str) -> Dict:
         """Scrapes detailed information for a single cologne."""
         try:
-            self.driver.get(url)
-            wait = WebDriverWait(self.driver, 10)
-            
+            html = self.fetch(url)
+            tree = lxml.html.fromstring(html)
+
             # Extract basic information
-            brand_name = wait.until(
-                EC.presence_of_element_located((By.CSS_SELECTOR, ".brand, [class*='brand']"))
-            ).text.strip()
-            
-            perfume_name = wait.until(
-                EC.presence_of_element_located((By.CSS_SELECTOR, ".name, [class*='name']"))
-            ).text.strip()
-            
+            brand_name = self.BRAND_XPATH(tree)[0].text_content().strip()
+            perfume_name = self.NAME_XPATH(tree)[0].text_content().strip()
+
             # Extract accords and notes
-            main_accords = []
-            try:
-                accord_elements = wait.until(
-                    EC.presence_of_all_elements_located((By.CSS_SELECTOR, ".accord, [class*='accord']"))
-                )
-                main_accords = [elem.text.strip() for elem in accord_elements]
-            except TimeoutException:
+            main_accords = [elem.text_content().strip() for elem in self.ACCORD_XPATH(tree)]
+            if not main_accords:
                 logging.warning(f"No accords found for {url}")
-            
-            fragrance_notes = []
-            try:
-                note_elements = wait.until(
-                    EC.presence_of_all_elements_located((By.CSS_SELECTOR, ".note, [class*='note']"))
-                )
-                fragrance_notes = [elem.text.strip() for elem in note_elements]
-            except TimeoutException:
+
+            fragrance_notes = [elem.text_content().strip() for elem in self.NOTE_XPATH(tree)]
+            if not fragrance_notes:
                 logging.warning(f"No notes found for {url}")
-            
+
             # Extract ratings
-            ratings = self.extract_ratings(wait)
-            
+            ratings = self.extract_ratings(tree)
+
             # Extract season and occasion
-            season = self.extract_pie_chart_data(self.driver, 'seasonData')
-            occasion = self.extract_pie_chart_data(self.driver, 'occasionData')
-            
+            season = self.extract_pie_chart_data(html, 'seasonData')
+            occasion = self.extract_pie_chart_data(html, 'occasionData')
+
             cologne_data = {
                 'brand_name': brand_name,
                 'perfume_name': perfume_name,
@@ -159,61 +180,60 @@ class ParfumoSeleniumScraper:
                 'occasion': occasion,
                 **ratings
             }
-            
+
             logging.info(f"Successfully scraped data for {brand_name} - {perfume_name}")
             return cologne_data
-            
+
         except Exception as e:
             logging.error(f"Error scraping cologne details for {url}: {str(e)}")
             return None
 
-    def scrape_all_colognes(self) -> pd.DataFrame:
-        """Scrapes information for all top 100 colognes and returns a DataFrame."""
+    def scrape_all_colognes(self, output_path: str) -> int:
+        """Scrapes all top 100 colognes, appending each to a CSV as soon as it is parsed.
+
+        Returns the number of colognes written.
+        """
         try:
             cologne_urls = self.get_cologne_urls()
-            
+
             if not cologne_urls:
                 logging.error("No cologne URLs found!")
-                return pd.DataFrame()
-                
-            all_data = []
-            
-            for i, url in enumerate(cologne_urls, 1):
-                try:
-                    logging.info(f"Scraping cologne {i}/100: {url}")
-                    cologne_data = self.scrape_cologne_details(url)
-                    if cologne_data:
-                        all_data.append(cologne_data)
-                    time.sleep(3)  # Be nice to the server
-                except Exception as e:
-                    logging.error(f"Error scraping {url}: {str(e)}")
-                    continue
-                    
-            if not all_data:
+                return 0
+
+            # Fetches overlap across worker threads; the rate limiter keeps us polite
+            logging.info(f"Scraping {len(cologne_urls)} colognes with {self.max_workers} workers")
+            written = 0
+            with open(output_path, 'w', newline='', encoding='utf-8') as csv_file:
+                writer = csv.DictWriter(csv_file, fieldnames=self.FIELDNAMES)
+                writer.writeheader()
+
+                with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                    for cologne_data in executor.map(self.scrape_cologne_details, cologne_urls):
+                        if cologne_data:
+                            writer.writerow(cologne_data)
+                            # Flush per row so a crash keeps everything scraped so far
+                            csv_file.flush()
+                            written += 1
+
+            if not written:
                 logging.error("No cologne data was successfully scraped!")
-                return pd.DataFrame()
-                
-            df = pd.DataFrame(all_data)
-            logging.info(f"Successfully created DataFrame with {len(df)} rows")
-            return df
-            
+            return written
+
         finally:
-            self.driver.quit()
+            self.session.close()
 
 def main():
-    scraper = ParfumoSeleniumScraper()
-    
-    # Scrape all cologne data
-    df = scraper.scrape_all_colognes()
-    
-    if not df.empty:
-        # Save to CSV
-        df.to_csv('parfumo/top_100_mens.csv', index=False)
+    scraper = ParfumoScraper()
+
+    # Scrape all cologne data, streaming rows to CSV
+    count = scraper.scrape_all_colognes('parfumo/top_100_mens.csv')
+
+    if count:
         logging.info("Data saved to 'top_100_mens.csv'")
-        logging.info(f"Number of colognes scraped: {len(df)}")
-        logging.info(f"Columns in the dataset: {df.columns.tolist()}")
+        logging.info(f"Number of colognes scraped: {count}")
+        logging.info(f"Columns in the dataset: {scraper.FIELDNAMES}")
     else:
         logging.error("No data was scraped. Check the logs for details.")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -1,10 +1,23 @@
 import base64
+import hashlib
+import io
+import mmap
+import os
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import numpy as np
 import pandas as pd
+from PIL import Image
 from typing import List, Dict
 from pathlib import Path
+from functools import lru_cache
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
 import json
 import ast
+import tempfile
+import time
 from datetime import datetime
 
 SYSTEM_PROMPT = """You are a fragrance recognition system. Analyze cologne bottles and output a JSON response with:
@@ -25,12 +38,62 @@ USER_PROMPT = """Analyze this image and return a JSON object with cologne bottle
     ]
 }"""
 
-def encode_image(image_path: str) -> str:
+# Keep-alive session shared by every API call, so connections (and their TLS
+# handshakes) are reused; transient connection failures are retried with backoff
+_SESSION = requests.Session()
+_ADAPTER = HTTPAdapter(pool_connections=4, pool_maxsize=8, max_retries=Retry(total=3, backoff_factor=0.3))
+_SESSION.mount('https://', _ADAPTER)
+_SESSION.mount('http://', _ADAPTER)
+
+# Parsed API responses, one JSON file per image content hash
+CACHE_DIR = Path('.cache/rec')
+
+# gpt-4o-mini re-tiles larger images anyway, so extra pixels only cost upload time
+MAX_IMAGE_SIDE = 1024
+
+@contextmanager
+def _open_image(image_path: str):
+    """Yields the image file's contents memory-mapped (b'' for an empty file, which can't be mapped)"""
     with open(image_path, "rb") as image_file:
-        return base64.b64encode(image_file.read()).decode('utf-8')
+        if os.fstat(image_file.fileno()).st_size == 0:
+            yield b''
+            return
+        with mmap.mmap(image_file.fileno(), 0, access=mmap.ACCESS_READ) as image:
+            yield image
+
+def _shrink_image(image: mmap.mmap):
+    """Returns the image as JPEG bytes no larger than MAX_IMAGE_SIDE, or the mapping unchanged if it already fits"""
+    if not image:
+        return image
+    try:
+        # Pillow reads straight from the mapping, so no copy is made just to check the size
+        image.seek(0)
+        with Image.open(image) as picture:
+            if max(picture.size) <= MAX_IMAGE_SIDE:
+                return image
+            picture.thumbnail((MAX_IMAGE_SIDE, MAX_IMAGE_SIDE))
+            buffer = io.BytesIO()
+            picture.convert('RGB').save(buffer, format='JPEG', quality=90)
+            return buffer.getvalue()
+    except (OSError, ValueError):
+        # Not something Pillow can read; send it as-is and let the API decide
+        return image
+
+def _encode_image(image, prefix: bytes = b"") -> str:
+    # The prefix is attached to the encoded bytes so the (large) string is only built once
+    return (prefix + base64.b64encode(_shrink_image(image))).decode('ascii')
 
 def analyze_image(image_path: str, api_key: str) -> dict:
-    base64_image = encode_image(image_path)
+    with _open_image(image_path) as image:
+        # Same bytes, same answer: skip the API call for images seen before
+        cache_file = CACHE_DIR / f"{hashlib.sha256(image).hexdigest()}.json"
+        try:
+            return json.loads(cache_file.read_text())
+        except (OSError, json.JSONDecodeError):
+            # Not cached yet (or an unreadable entry, which the new answer replaces)
+            pass
+        
+        image_url = _encode_image(image, prefix=b"data:image/jpeg;base64,")
     
     headers = {
         "Content-Type": "application/json",
@@ -48,7 +111,7 @@ def analyze_image(image_path: str, api_key: str) -> dict:
                     {
                         "type": "image_url",
                         "image_url": {
-                            "url": f"data:image/jpeg;base64,{base64_image}"
+                            "url": image_url
                         }
                     }
                 ]
@@ -58,7 +121,7 @@ def analyze_image(image_path: str, api_key: str) -> dict:
         "response_format": { "type": "json_object" }
     }
     
-    response = requests.post(
+    response = _SESSION.post(
         "https://api.openai.com/v1/chat/completions",
         headers=headers,
         json=payload
@@ -67,73 +130,86 @@ def analyze_image(image_path: str, api_key: str) -> dict:
     
     if 'error' in json_response:
         raise Exception(f"API Error: {json_response['error']['message']}")
-        
-    return json.loads(json_response["choices"][0]["message"]["content"])
+    
+    result = json.loads(json_response["choices"][0]["message"]["content"])
+    # Written to a temporary file first, so a concurrent or interrupted write
+    # never leaves a truncated entry behind
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    with tempfile.NamedTemporaryFile('w', dir=CACHE_DIR, suffix='.tmp', delete=False) as tmp:
+        tmp.write(json.dumps(result))
+    os.replace(tmp.name, cache_file)
+    return result
 
-def get_weather(api_key: str, city: str = "Austin") -> Dict:
-    """Get current weather data from OpenWeatherMap"""
+@lru_cache(maxsize=32)
+def _fetch_weather(api_key: str, city: str, time_bucket: int) -> Dict:
+    # time_bucket only feeds the cache key, so entries expire when it rolls over
     url = f"http://api.openweathermap.org/data/2.5/weather?q={city}&appid={api_key}&units=imperial"
-    response = requests.get(url)
+    response = _SESSION.get(url)
     data = response.json()
     
     return {
         'temp': data['main']['temp'],
         'humidity': data['main']['humidity'],
-        'condition': data['weather'][0]['main'].lower(),
-        'time_of_day': 'day' if 6 <= datetime.now().hour < 18 else 'night'
+        'condition': data['weather'][0]['main'].lower()
     }
 
+@lru_cache(maxsize=1)
+def _time_of_day(minute: int) -> str:
+    # Keyed on the current minute, so the clock is only consulted once a minute
+    return 'day' if 6 <= datetime.now().hour < 18 else 'night'
+
+def get_weather(api_key: str, city: str = "Austin", ttl: int = 600) -> Dict:
+    """Get current weather data from OpenWeatherMap, reusing readings up to ttl seconds old"""
+    weather = dict(_fetch_weather(api_key, city, int(time.time() // ttl)))
+    weather['time_of_day'] = _time_of_day(int(time.time() // 60))
+    return weather
+
+# Accord groups each weather rule looks for
+WARM_ACCORDS = frozenset({'warm spicy', 'oriental'})
+HOT_ACCORDS = frozenset({'fresh', 'citrus'})
+RAIN_ACCORDS = frozenset({'aquatic', 'fresh'})
+CLEAR_ACCORDS = frozenset({'citrus', 'fresh'})
+
 class CologneRecommender:
     def __init__(self, cologne_db: pd.DataFrame):
         self.cologne_db = cologne_db
         
-    def _calculate_weather_score(self, cologne: pd.Series, weather: Dict) -> float:
-        score = 0.0
+    def _calculate_weather_scores(self, colognes: pd.DataFrame, weather: Dict) -> pd.Series:
+        score = pd.Series(0.0, index=colognes.index)
         
-        # Convert string representation of lists to actual lists
-        accords = ast.literal_eval(cologne['accords'])
+        def has_any(group: frozenset) -> pd.Series:
+            return colognes['accords_set'].map(lambda a: not a.isdisjoint(group))
         
         # Temperature scoring
         if weather['temp'] < 60:
-            if cologne['season'] in ['fall', 'winter']:
-                score += 1.0
-            if 'warm spicy' in accords or 'oriental' in accords:
-                score += 0.5
+            score += 1.0 * colognes['season'].isin(['fall', 'winter'])
+            score += 0.5 * has_any(WARM_ACCORDS)
         elif weather['temp'] > 80:
-            if cologne['season'] in ['spring', 'summer']:
-                score += 1.0
-            if 'fresh' in accords or 'citrus' in accords:
-                score += 0.5
+            score += 1.0 * colognes['season'].isin(['spring', 'summer'])
+            score += 0.5 * has_any(HOT_ACCORDS)
         else:
             score += 0.5  # Moderate temperature suits most fragrances
             
         # Weather condition scoring
         if weather['condition'] == 'rain':
-            if 'aquatic' in accords or 'fresh' in accords:
-                score += 0.5
+            score += 0.5 * has_any(RAIN_ACCORDS)
         elif weather['condition'] == 'clear':
-            if 'citrus' in accords or 'fresh' in accords:
-                score += 0.5
+            score += 0.5 * has_any(CLEAR_ACCORDS)
             
         return score
         
-    def _calculate_occasion_score(self, cologne: pd.Series, occasion: str) -> float:
-        return 1.0 if cologne['occasion'] == occasion else 0.0
+    def _calculate_occasion_scores(self, colognes: pd.DataFrame, occasion: str) -> pd.Series:
+        return 1.0 * (colognes['occasion'] == occasion)
         
     def recommend(self, collection: List[Dict], weather: Dict, occasion: str) -> Dict:
-        best_score = -1
         recommendation = None
         
-        for cologne in collection:
-            cologne_series = pd.Series(cologne)
-            weather_score = self._calculate_weather_score(cologne_series, weather)
-            occasion_score = self._calculate_occasion_score(cologne_series, occasion)
-            
-            total_score = weather_score + occasion_score
-            
-            if total_score > best_score:
-                best_score = total_score
-                recommendation = cologne
+        # Score the whole collection in one pass; idxmax keeps the first of any ties.
+        # Only the scored fields are loaded into the frame
+        if collection:
+            colognes = pd.DataFrame(collection, columns=['season', 'accords_set', 'occasion'])
+            total_score = self._calculate_weather_scores(colognes, weather) + self._calculate_occasion_scores(colognes, occasion)
+            recommendation = collection[total_score.idxmax()]
                 
         return {
             'recommendation': recommendation,
@@ -142,26 +218,46 @@ class CologneRecommender:
 
 class CologneRecognizer:
     def __init__(self, database_path: str):
-        self.cologne_db = pd.read_csv(database_path)
+        # Low-cardinality columns as categories: less memory, int-code equality tests
+        self.cologne_db = pd.read_csv(
+            database_path,
+            dtype={'brand': 'category', 'season': 'category', 'occasion': 'category'}
+        )
+        # Parse the stringified accord lists once (compute once, reuse); matched
+        # rows carry the set through to the recommender
+        self.cologne_db['accords_set'] = self.cologne_db['accords'].map(lambda x: frozenset(ast.literal_eval(x)))
         self.api_key = None
+        # Distinct lowercased brands plus each row's code, so matching tests brands, not rows
+        self._brand_names, self._brand_codes = np.unique(
+            self.cologne_db['brand'].str.lower().fillna('').to_numpy(dtype=str), return_inverse=True
+        )
+        self._perfume_lower = self.cologne_db['perfume'].str.lower().to_numpy(dtype=str)
         self.recommender = CologneRecommender(self.cologne_db)
 
     def analyze_image(self, image_path: str) -> List[Dict]:
         result = analyze_image(image_path, self.api_key)
         return self._match_with_database(result['colognes'])
 
+    def analyze_images(self, image_paths: List[str], max_workers: int = 4) -> List[Dict]:
+        """Analyze several photos concurrently and return the combined collection"""
+        # A photo queued twice is only sent once; the content-hash cache covers
+        # copies of the same image under different paths on later runs
+        unique_paths = list(dict.fromkeys(image_paths))
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            results = dict(zip(unique_paths, executor.map(self.analyze_image, unique_paths)))
+        return [cologne for path in image_paths for cologne in results[path]]
+
     def _match_with_database(self, detected_colognes: List[Dict]) -> List[Dict]:
         matched_colognes = []
         
         for cologne in detected_colognes:
             brand_terms = cologne['brand'].lower().split()
-            brand_match = self.cologne_db['brand'].str.lower().apply(
-                lambda x: any(term in x for term in brand_terms)
-            )
+            brand_found = np.zeros(len(self._brand_names), dtype=bool)
+            for term in brand_terms:
+                brand_found |= np.char.find(self._brand_names, term) >= 0
+            brand_match = brand_found[self._brand_codes]
             
-            name_match = self.cologne_db['perfume'].str.contains(
-                cologne['name'], case=False, regex=False
-            )
+            name_match = np.char.find(self._perfume_lower, cologne['name'].lower()) >= 0
             
             match = self.cologne_db[brand_match & name_match]
             
@@ -184,9 +280,9 @@ if __name__ == "__main__":
     recognizer = CologneRecognizer("raw_data/top_100_mens_cleaned.csv")
     recognizer.api_key = openai_key
     
-    # Get collection from image
-    image_path = input("Enter path to cologne image: ")
-    collection = recognizer.analyze_image(image_path)
+    # Get collection from one or more images
+    image_paths = input("Enter path(s) to cologne image(s), comma separated: ").split(',')
+    collection = recognizer.analyze_images([path.strip() for path in image_paths])
     
     print("\nRecognized Collection:")
     for cologne in collection:
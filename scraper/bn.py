@@ -1,138 +1,254 @@
-from bs4 import BeautifulSoup
-from multiprocessing.dummy import Pool
+from bs4 import BeautifulSoup, SoupStrainer
+import aiohttp
+import asyncio
 import os
 import time
-import requests
 import json
-import glob
 import shutil
+from urllib.parse import urlparse
+
+# Optional speedups: libuv event loop and c-ares DNS resolution (which keeps
+# lookups off the default thread pool); plain asyncio is used without them
+try:
+    import uvloop
+except ImportError:
+    uvloop = None
+try:
+    import aiodns  # noqa: F401 (aiohttp's AsyncResolver needs it)
+    HAS_AIODNS = True
+except ImportError:
+    HAS_AIODNS = False
 
 #location for the reviews
 BASE_URL = 'http://www.basenotes.net/fragrancereviews/page/{0}'
-session = requests.Session()
 HEADERS = {
     'user-agent': ('Mozilla/5.0 (Macintosh; Intel Mac OS X 10_11_5) AppleWebKit/537.36 '
                    '(KHTML, like Gecko) Chrome/65.0.3325.181 Safari/537.36')
 }
 DATA_DIR = 'data'
 FILENAME = 'perfume-data'
+# Review urls already scraped into DATA_DIR, one per line
+SEEN_FILE = 'seen-urls.txt'
+# Widths of the labels that lead the year, gender and availability table cells
+INFO_LABEL_WIDTHS = (14, 6, 12)
+# Requests in flight at once to any one host, across every page and review fetch
+MAX_REQUESTS_PER_HOST = 4
+# Dropped connections and these statuses are retried with backoff; a host's
+# rate-limit headers hold back every request to it, not just the one retrying
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+MAX_TRIES = 5
+# Seconds between progress lines
+STATUS_INTERVAL = 1.0
+
+def has_class(name):
+    # While parsing, the strainer sees the raw class attribute ('a b'), so split
+    # it to match any of the element's classes, as find_all does
+    return lambda classes: classes is not None and name in (classes.split() if isinstance(classes, str) else classes)
+
+# Only these blocks are read from each page, so the parser builds nothing else
+REVIEW_BLOCKS = SoupStrainer('div', class_=has_class('reviewblurb'))
+INFO_BLOCKS = SoupStrainer('div', class_=has_class('peoplelist'))
+
+class HostThrottle():
+    """Caps concurrent requests to one host and holds them all back while it asks us to wait"""
+
+    def __init__(self, max_concurrency=MAX_REQUESTS_PER_HOST):
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.next_available_ts = 0.0
+
+    async def __aenter__(self):
+        await self.semaphore.acquire()
+        try:
+            # Re-checked after waking, since another response may have pushed
+            # the slot back further in the meantime
+            while (delay := self.next_available_ts - time.monotonic()) > 0:
+                await asyncio.sleep(delay)
+        except BaseException:
+            # Cancelled while waiting: __aexit__ won't run, so free the slot here
+            self.semaphore.release()
+            raise
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        self.semaphore.release()
+
+    def update(self, headers):
+        """Returns the wait the host asked for (Retry-After or an exhausted X-RateLimit quota), if any, after applying it"""
+        wait = None
+        retry_after = headers.get('Retry-After', '')
+        if retry_after.isdigit():
+            wait = int(retry_after)
+        elif headers.get('X-RateLimit-Remaining') == '0':
+            reset = headers.get('X-RateLimit-Reset', '')
+            if reset.isdigit():
+                # Some hosts send seconds until reset, others the epoch time of it
+                wait = int(reset) - time.time() if int(reset) > 1e9 else int(reset)
+        if wait is not None and wait > 0:
+            self.next_available_ts = max(self.next_available_ts, time.monotonic() + wait)
+        return wait
 
 class Scraper():
     """Scraper for basenotes.com"""
 
     def __init__(self, pages_scraped=(1,1), num_jobs=1, clear_old_data=True):
         self.pages_scraped = pages_scraped
+        # Review list pages scraped at once; each page's review lookups run concurrently
         self.num_jobs = num_jobs
         self.clear_old_data = clear_old_data
-        self.session = requests.Session()
         self.est_reviews = (pages_scraped[1] + 1 - pages_scraped[0]) * 30
         self.review_count = 0
-        self.start_time = time.time()
-        
-        if num_jobs > 1:
-            self.multiprocessing = True
-            self.worker_pool = Pool(num_jobs)
-        else:
-            self.multiprocessing = False
+        self.start_time = time.monotonic()
 
     def scrape_site(self):
         if self.clear_old_data:
             self.clear_data_dir()
-        if self.multiprocessing:
-            link_list = [BASE_URL.format(page) for page in range(self.pages_scraped[0],self.pages_scraped[1] + 1)]
-            records = self.worker_pool.map(self.scrape_page, link_list)
-            self.worker_pool.terminate()
-            self.worker_pool.join()
-        else:
-            for page in range(self.pages_scraped[0], self.pages_scraped[1] + 1):
-                self.scrape_page(BASE_URL.format(page))
+        (uvloop.run if uvloop else asyncio.run)(self.scrape_all())
         print('Scrape finished...')
         self.condense_data()
 
-    def scrape_page(self, page_url, review_count=0, retry_count=0):
-        scrape_data = []
+    async def scrape_all(self):
+        link_list = [BASE_URL.format(page) for page in range(self.pages_scraped[0], self.pages_scraped[1] + 1)]
+        self.host_throttles = {}
+        page_slots = asyncio.Semaphore(self.num_jobs)
+        self.seen_urls = self.load_seen_urls()
+
+        async def scrape_bounded(session, page_url):
+            async with page_slots:
+                await self.scrape_page(session, page_url)
+
+        # One keep-alive session for the whole crawl
+        connector = aiohttp.TCPConnector(
+            limit_per_host=MAX_REQUESTS_PER_HOST,
+            resolver=aiohttp.AsyncResolver() if HAS_AIODNS else None,
+            ttl_dns_cache=300
+        )
+        # Pages report finished reviews on a queue; one task turns them into status lines
+        self.progress = asyncio.Queue()
+        reporter = asyncio.create_task(self.report_progress())
         try:
-            response = self.session.get(page_url, headers=HEADERS)
-        except:
-            retry_count += 1
-            if retry_count <= 3:
-                self.session = requests.Session()
-                self.scrape_page(page_url, review_count, retry_count)
-            else:
-                raise
-
-        soup = BeautifulSoup(response.content, 'html.parser')
+            async with aiohttp.ClientSession(headers=HEADERS, connector=connector) as session:
+                await asyncio.gather(*[scrape_bounded(session, page_url) for page_url in link_list])
+        finally:
+            self.progress.put_nowait(None)
+            await reporter
+
+    def host_throttle(self, url):
+        host = urlparse(url).netloc
+        if host not in self.host_throttles:
+            self.host_throttles[host] = HostThrottle()
+        return self.host_throttles[host]
+
+    async def fetch(self, session, url):
+        """Returns url's body, retrying dropped connections and RETRY_STATUSES responses with backoff"""
+        throttle = self.host_throttle(url)
+        for attempt in range(1, MAX_TRIES + 1):
+            delay = 0.5 * 2 ** attempt
+            try:
+                async with throttle:
+                    async with session.get(url) as response:
+                        # Applied on every response, so one 429 delays the whole host
+                        host_wait = throttle.update(response.headers)
+                        if response.status not in RETRY_STATUSES:
+                            return await response.read()
+                        if attempt == MAX_TRIES:
+                            response.raise_for_status()
+                        if host_wait is not None:
+                            # The throttle already holds this retry back with the rest
+                            delay = 0
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+                if attempt == MAX_TRIES:
+                    raise
+            await asyncio.sleep(delay)
+
+    async def scrape_page(self, session, page_url):
+        scrape_data = []
+        soup = BeautifulSoup(await self.fetch(session, page_url), 'lxml', parse_only=REVIEW_BLOCKS)
         reviews = soup.find_all('div', {'class': 'reviewblurb'})[0:]
+        review_urls = []
         for review in reviews:
             review_url = review.find('a')['href']
-            #parse perfume name and maker
-            split_name = str(review.find('a')).split('>')
-            
-            self.review_count += 1
-            split = split_name[1][0:-3].split(' by ')
-            perfume_name = split[0]
-            perfume_maker = split[1]
-            
-            #parse review
-            split_review = str(review).split('</h2>')
-            review_text = split_review[len(split_review)-1][0:-6]
-            
-            #parse information
-            rating, year, gender, availability = self.scrape_info(review_url)
-            
-            review_data = {
-            'perfume': perfume_name,
-            'maker': perfume_maker,
-            'review': review_text,
+            # Reviews shift between list pages as new ones are posted, and runs
+            # with clear_old_data=False revisit old pages; skip any already seen
+            if review_url in self.seen_urls:
+                continue
+            self.seen_urls.add(review_url)
+            review_urls.append(review_url)
+            scrape_data.append(self.parse_review(review))
+        
+        #parse information, fetching every review's info page at once
+        try:
+            infos = await asyncio.gather(*[self.scrape_info(session, review_url) for review_url in review_urls])
+        except BaseException:
+            # Nothing from this page was saved, so later pages may still scrape these
+            self.seen_urls.difference_update(review_urls)
+            raise
+        for review_data, (rating, year, gender, availability) in zip(scrape_data, infos):
+            review_data.update({
             'rating': rating,
             'year': year,
             'gender': gender,
             'availability': availability
-            }
-             
-            scrape_data.append(review_data)
-            self.update_scrape_status()
+            })
         self.save_data(scrape_data)
+        self.save_seen_urls(review_urls)
+        self.progress.put_nowait(len(scrape_data))
         
-    def scrape_info(self, review_url):
-        info_response = self.session.get(review_url, headers=HEADERS)
-        info_soup = BeautifulSoup(info_response.content, 'html.parser')
+    def parse_review(self, review):
+        link = review.find('a')
+        #parse perfume name and maker from the link's "<name> by <maker>" title
+        perfume_name, _, perfume_maker = link.decode_contents().partition(' by ')
+
+        #parse review: drop the blurb's last heading and everything before
+        #it, leaving the review markup (a blurb without one is all review)
+        headings = review.find_all('h2')
+        if headings:
+            for node in [*headings[-1].previous_siblings, headings[-1]]:
+                node.extract()
+        review_text = review.decode_contents()
+
+        return {
+        'perfume': perfume_name,
+        'maker': perfume_maker,
+        'review': review_text
+        }
+
+    async def scrape_info(self, session, review_url):
+        info_soup = BeautifulSoup(await self.fetch(session, review_url), 'lxml', parse_only=INFO_BLOCKS)
         info = info_soup.find_all('div', {'class': 'peoplelist'})[0:]
         try:
             rating = info[0].find('meta')['content']
         except TypeError:
             rating = float('nan')
-        info_parse = str(info[0:]).split('<td>')
-        info_parse = self.remove_brackets(info_parse)
-        year = info_parse[1][14:]
-        gender = info_parse[2][6:]
-        availability = info_parse[3][12:]
+        # The first three table cells are "<label> <value>"; drop each label
+        cells = [cell.get_text() for cell in info[0].find_all('td', limit=3)]
+        year, gender, availability = (cell[width:] for cell, width in zip(cells, INFO_LABEL_WIDTHS))
         return rating, year, gender, availability
-            
-    def remove_brackets(self, input_list):
-        ret = [None]*len(input_list)
-        skip1c = 0
-        for j in range(0,len(input_list)-1):
-            words = ''
-            for i in input_list[j]:
-                if i == '<':
-                    skip1c += 1
-                elif i == '>' and skip1c > 0:
-                        skip1c -= 1
-                elif skip1c == 0:
-                    words += i
-            ret[j] = words
-        return ret
 
     def save_data(self, data):
-        filename = '{}/{}_{}.json'.format(DATA_DIR, FILENAME, time.time())
+        # Every page appends its records to one JSON Lines file; the event loop
+        # runs one save at a time, so lines never interleave
+        filename = '{}/{}.jsonl'.format(DATA_DIR, FILENAME)
         try:
             os.makedirs(DATA_DIR)
         except OSError:
             pass
-        with open(filename, 'w') as fout:
-            json.dump(data, fout)
+        with open(filename, 'a') as fout:
+            for record in data:
+                fout.write(json.dumps(record) + '\n')
     
+    def load_seen_urls(self):
+        try:
+            with open('{}/{}'.format(DATA_DIR, SEEN_FILE)) as fin:
+                return set(fin.read().split())
+        except FileNotFoundError:
+            return set()
+
+    def save_seen_urls(self, urls):
+        # Written after the page's records, so a crash before then rescrapes it
+        # next run instead of losing it
+        with open('{}/{}'.format(DATA_DIR, SEEN_FILE), 'a') as fout:
+            fout.writelines(url + '\n' for url in urls)
+
     def clear_all_data(self):
         self.clear_data_dir()
         self.clear_output_data()
@@ -145,25 +261,40 @@ class Scraper():
 
     def clear_output_data(self):
         try:
-            os.remove('{}.json'.format(FILENAME))
+            os.remove('{}.jsonl'.format(FILENAME))
         except FileNotFoundError:
             pass
 
     def condense_data(self):
+        # Records are already in one file, so publishing it is a plain copy
+        # (kept in DATA_DIR so runs with clear_old_data=False append to it)
         print('Condensing Data...')
-        condensed_data = []
-        all_files = glob.glob('{}/*.json'.format(DATA_DIR))
-        for file in all_files:
-            with open(file, 'rb') as fin:
-                condensed_data += json.load(fin)
-        print(len(condensed_data))
-        filename = '{}.json'.format(FILENAME)
-        with open(filename, 'w') as fout:
-            json.dump(condensed_data, fout)
+        data_file = '{}/{}.jsonl'.format(DATA_DIR, FILENAME)
+        filename = '{}.jsonl'.format(FILENAME)
+        try:
+            shutil.copyfile(data_file, filename)
+        except FileNotFoundError:
+            open(filename, 'w').close()
+        with open(filename, 'rb') as fin:
+            print(sum(1 for _ in fin))
+
+    async def report_progress(self):
+        # Adds up the review counts pages put on self.progress, printing at most
+        # one status line per STATUS_INTERVAL; None ends the crawl
+        last_report = 0.0
+        while True:
+            done = await self.progress.get()
+            if done is None:
+                self.update_scrape_status()
+                return
+            self.review_count += done
+            if time.monotonic() - last_report >= STATUS_INTERVAL:
+                last_report = time.monotonic()
+                self.update_scrape_status()
 
     def update_scrape_status(self):
-        elapsed_time = round(time.time() - self.start_time, 2)
-        time_remaining = round((self.est_reviews - self.review_count) * (self.review_count / elapsed_time), 2)
+        elapsed_time = round(time.monotonic() - self.start_time, 2)
+        time_remaining = round(max(self.est_reviews - self.review_count, 0) * elapsed_time / max(self.review_count, 1), 2)
         print('{0}/{1} reviews pulled | {2}s elapsed | {3}s remain\r'.format(
             self.review_count, self.est_reviews, elapsed_time, time_remaining))
 
@@ -4,15 +4,32 @@ import aiohttp
 import asyncio
 import logging
 import json
+import hashlib
+import os
+import random
+import time
+import numpy as np
 import pandas as pd
-from bs4 import BeautifulSoup
 from typing import List, Dict, Optional
+from collections import OrderedDict
 from datetime import datetime
 from dataclasses import dataclass
-from urllib.parse import urljoin
+from urllib.parse import urljoin, urlparse
 import backoff  # For exponential backoff on failures
 import aiofiles  # For async file operations
 
+# Optional speedups: libuv event loop and c-ares DNS resolution (which keeps
+# lookups off the default thread pool); plain asyncio is used without them
+try:
+    import uvloop
+except ImportError:
+    uvloop = None
+try:
+    import aiodns  # noqa: F401 (aiohttp's AsyncResolver needs it)
+    HAS_AIODNS = True
+except ImportError:
+    HAS_AIODNS = False
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -45,6 +62,98 @@ class ScrapingError(Exception):
     """Custom exception for scraping errors"""
     pass
 
+class HostThrottle:
+    """
+    Per-host request gate: caps concurrent requests and holds new ones back
+    for as long as the host's rate-limit headers ask.
+    """
+    
+    def __init__(self, max_concurrency: int = 4):
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.next_available_ts = 0.0
+        
+    async def __aenter__(self):
+        await self.semaphore.acquire()
+        try:
+            # Re-checked after waking, since another response may have pushed
+            # the slot back further in the meantime
+            while (delay := self.next_available_ts - time.monotonic()) > 0:
+                await asyncio.sleep(delay)
+        except BaseException:
+            # Cancelled while waiting: __aexit__ won't run, so free the slot here
+            self.semaphore.release()
+            raise
+        return self
+        
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        self.semaphore.release()
+        
+    def update(self, headers) -> None:
+        """Push back the next request slot per Retry-After or an exhausted X-RateLimit quota."""
+        wait = None
+        retry_after = headers.get('Retry-After')
+        if retry_after and retry_after.isdigit():
+            wait = int(retry_after)
+        elif headers.get('X-RateLimit-Remaining') == '0':
+            reset = headers.get('X-RateLimit-Reset', '')
+            if reset.isdigit():
+                # Some hosts send seconds until reset, others the epoch time of it
+                wait = int(reset) - time.time() if int(reset) > 1e9 else int(reset)
+        
+        if wait and wait > 0:
+            self.next_available_ts = max(self.next_available_ts, time.monotonic() + wait)
+
+class PageCache:
+    """
+    Fetched pages kept on disk between runs, with the most recently used ones
+    also held in memory (bounded, so long crawls don't grow without limit).
+    """
+    
+    def __init__(self, directory: str = '.cache/pages', ttl: float = 7 * 86400, max_entries: int = 2000):
+        self.directory = directory
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        
+    def _path(self, url: str) -> str:
+        return os.path.join(self.directory, hashlib.sha256(url.encode('utf-8')).hexdigest() + '.html')
+        
+    def _remember(self, url: str, html: str, fetched_at: float) -> None:
+        self.entries[url] = (fetched_at, html)
+        self.entries.move_to_end(url)
+        if len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+            
+    async def get(self, url: str) -> Optional[str]:
+        """Return the cached page for url, or None if it is missing or older than ttl."""
+        if url in self.entries:
+            # Memory entries keep their fetch time, so they expire with the disk copy
+            fetched_at, html = self.entries[url]
+            if time.time() - fetched_at > self.ttl:
+                del self.entries[url]
+                return None
+            self.entries.move_to_end(url)
+            return html
+        
+        path = self._path(url)
+        try:
+            fetched_at = os.path.getmtime(path)
+        except FileNotFoundError:
+            return None
+        if time.time() - fetched_at > self.ttl:
+            return None
+        
+        async with aiofiles.open(path, 'r', encoding='utf-8') as f:
+            html = await f.read()
+        self._remember(url, html, fetched_at)
+        return html
+        
+    async def set(self, url: str, html: str) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        async with aiofiles.open(self._path(url), 'w', encoding='utf-8') as f:
+            await f.write(html)
+        self._remember(url, html, time.time())
+
 class FragranceScraper:
     def __init__(self, config_path: str = 'scraper_config.json'):
         """
@@ -55,10 +164,17 @@ class FragranceScraper:
         """
         self.config = self._load_config(config_path)
         self.session = None
-        self.data_cache = {}
+        self._session_users = 0
+        self.data_cache = PageCache(
+            self.config.get('cache_dir', '.cache/pages'),
+            ttl=self.config.get('cache_ttl', 7 * 86400),
+            max_entries=self.config.get('cache_size', 2000)
+        )
         self.proxy_list = self.config.get('proxies', [])
         self.current_proxy_index = 0
         self.failed_urls = set()
+        self.host_throttles = {}
+        self.in_flight = {}
         
     def _load_config(self, config_path: str) -> dict:
         """Load scraping configuration including API keys and rate limits."""
@@ -89,8 +205,24 @@ class FragranceScraper:
         self.current_proxy_index = (self.current_proxy_index + 1) % len(self.proxy_list)
         return self.proxy_list[self.current_proxy_index]
 
+    def _host_throttle(self, url: str) -> HostThrottle:
+        """Get the throttle shared by every request to url's host."""
+        host = urlparse(url).netloc
+        if host not in self.host_throttles:
+            self.host_throttles[host] = HostThrottle(self.config.get('max_concurrency_per_host', 4))
+        return self.host_throttles[host]
+
     async def __aenter__(self):
-        """Set up async context manager with custom headers and retry logic."""
+        """
+        Set up async context manager with custom headers and retry logic.
+        
+        Nested entries (e.g. several scrape_fragrance_data calls inside one
+        `async with scraper:` block) share one session and its connection pool.
+        """
+        self._session_users += 1
+        if self.session is not None and not self.session.closed:
+            return self
+        
         headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
             'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
@@ -102,16 +234,29 @@ class FragranceScraper:
         }
         
         timeout = aiohttp.ClientTimeout(total=self.config.get('timeout', 30))
+        # Bounded pool: keep-alive connections are reused, and no single host
+        # gets more than a handful at once
+        connector = aiohttp.TCPConnector(
+            limit=64,
+            limit_per_host=8,
+            keepalive_timeout=30,
+            resolver=aiohttp.AsyncResolver() if HAS_AIODNS else None,
+            use_dns_cache=True,
+            ttl_dns_cache=300
+        )
         self.session = aiohttp.ClientSession(
+            connector=connector,
             headers=headers,
             timeout=timeout
         )
         return self
 
     async def __aexit__(self, exc_type, exc_val, exc_tb):
-        """Clean up async context manager."""
-        if self.session:
+        """Clean up async context manager once the outermost user exits."""
+        self._session_users -= 1
+        if self.session and self._session_users == 0:
             await self.session.close()
+            self.session = None
 
     @backoff.on_exception(
         backoff.expo,
@@ -131,24 +276,78 @@ class FragranceScraper:
         Raises:
             ScrapingError: If page cannot be fetched after retries
         """
+        # Callers asking for a url that is already being fetched (e.g. repeats
+        # among concurrent fetches, which would all miss the cache at once)
+        # wait on that fetch instead of sending their own request. Shielded so
+        # one caller being cancelled doesn't cancel it for the others
+        fetch = self.in_flight.get(url)
+        if fetch is None:
+            fetch = asyncio.ensure_future(self._download_page(url))
+            self.in_flight[url] = fetch
+            fetch.add_done_callback(lambda _: self.in_flight.pop(url, None))
+        return await asyncio.shield(fetch)
+
+    async def _download_page(self, url: str) -> str:
+        """Fetch a page for _fetch_page, from the cache or with one request (plus retries)."""
+        # Pages fetched recently (this run or a previous one) need no request
+        cached = await self.data_cache.get(url)
+        if cached is not None:
+            return cached
+        
         proxy = self._get_next_proxy()
+        throttle = self._host_throttle(url)
         
         try:
-            async with self.session.get(url, proxy=proxy) as response:
-                if response.status == 200:
-                    return await response.text()
-                elif response.status == 429:  # Too Many Requests
-                    retry_after = int(response.headers.get('Retry-After', 60))
-                    logger.warning(f"Rate limited. Waiting {retry_after} seconds...")
-                    await asyncio.sleep(retry_after)
-                    raise ScrapingError("Rate limited")
-                else:
-                    raise ScrapingError(f"HTTP {response.status}: {url}")
+            # Any number of fetches may be in flight; only a few hit one host at a
+            # time, and none while the host has asked us to wait
+            attempts = self.config.get('rate_limit_retries', 5)
+            for attempt in range(attempts):
+                async with throttle:
+                    async with self.session.get(url, proxy=proxy) as response:
+                        throttle.update(response.headers)
+                        if response.status == 200:
+                            html = await self._read_text(response)
+                            await self.data_cache.set(url, html)
+                            return html
+                        elif response.status not in (429, 503):  # Too Many Requests / Unavailable
+                            raise ScrapingError(f"HTTP {response.status}: {url}")
+                
+                if attempt + 1 < attempts:
+                    delay = 2 ** attempt + random.random()
+                    logger.warning(f"Rate limited (HTTP {response.status}). Retrying in {delay:.1f} seconds...")
+                    await asyncio.sleep(delay)
+                
+            raise ScrapingError("Rate limited")
         except Exception as e:
             logger.error(f"Error fetching {url}: {str(e)}")
             self.failed_urls.add(url)
             raise
 
+    @staticmethod
+    async def _read_text(response: aiohttp.ClientResponse) -> str:
+        """
+        Read a response body chunk by chunk into one buffer and decode it once.
+        
+        response.text() keeps every received chunk and then joins them into a
+        second full copy before decoding; this keeps a single copy of the bytes.
+        The buffer is sized from Content-Length up front and only grows if the
+        body turns out longer (e.g. a compressed transfer).
+        """
+        body = bytearray(response.content_length or 0)
+        position = 0
+        async for chunk in response.content.iter_chunked(16384):
+            body[position:position + len(chunk)] = chunk
+            position += len(chunk)
+        del body[position:]
+        
+        # get_encoding() can't be used here: without a charset in Content-Type
+        # it falls back to sniffing response._body, which streaming never sets.
+        # Like response.text(), fall back to UTF-8 for missing or unknown charsets
+        try:
+            return body.decode(response.charset or 'utf-8')
+        except LookupError:
+            return body.decode('utf-8')
+
     async def scrape_fragrance_data(
         self,
         sources: List[str] = ['fragrantica', 'basenotes'],
@@ -167,20 +366,19 @@ class FragranceScraper:
         all_data = []
         
         async with self as scraper:
-            for source in sources:
-                try:
-                    if source == 'fragrantica':
-                        data = await self._scrape_fragrantica(max_fragrances)
-                    elif source == 'basenotes':
-                        data = await self._scrape_basenotes(max_fragrances)
-                    else:
-                        logger.warning(f"Unknown source: {source}")
-                        continue
-                        
-                    all_data.extend(data)
-                except Exception as e:
-                    logger.error(f"Error scraping {source}: {str(e)}")
+            # Sources are independent sites, so fetch them concurrently; results
+            # come back in source order and one failure doesn't cancel the rest
+            results = await asyncio.gather(
+                *[self._scrape_source(source, max_fragrances) for source in sources],
+                return_exceptions=True
+            )
+            
+            for source, data in zip(sources, results):
+                if isinstance(data, Exception):
+                    logger.error(f"Error scraping {source}: {str(data)}")
                     continue
+                    
+                all_data.extend(data)
 
         # Process and save data
         df = self._process_scraped_data(all_data)
@@ -191,45 +389,69 @@ class FragranceScraper:
         
         return df
 
+    async def _scrape_source(self, source: str, max_fragrances: Optional[int]) -> List[FragranceData]:
+        """Dispatch to the scraper for a single source website."""
+        if source == 'fragrantica':
+            return await self._scrape_fragrantica(max_fragrances)
+        elif source == 'basenotes':
+            return await self._scrape_basenotes(max_fragrances)
+        
+        logger.warning(f"Unknown source: {source}")
+        return []
+
     def _process_scraped_data(self, data: List[FragranceData]) -> pd.DataFrame:
         """Process raw scraped data into a structured DataFrame."""
-        processed_data = []
+        # Build one typed array per column and hand pandas the whole table at
+        # once, rather than a dict per fragrance it has to union and infer
+        columns = {
+            'name': [frag.name for frag in data],
+            'brand': pd.Categorical([frag.brand for frag in data]),
+            'release_year': pd.array([frag.release_year for frag in data], dtype='Int16'),
+            'longevity': np.array([frag.longevity for frag in data], dtype=float),
+            'sillage': np.array([frag.sillage for frag in data], dtype=float),
+            'seasons': [','.join(frag.seasons) for frag in data],
+            'occasions': [','.join(frag.occasions) for frag in data],
+            'sources': [','.join(frag.source_urls) for frag in data]
+        }
         
+        # Process notes by category, bucketing each fragrance's notes in one pass
+        note_columns = {category: ([], []) for category in ['top', 'heart', 'base']}
         for frag in data:
-            # Flatten the fragrance data structure
-            flat_data = {
-                'name': frag.name,
-                'brand': frag.brand,
-                'release_year': frag.release_year,
-                'longevity': frag.longevity,
-                'sillage': frag.sillage,
-                'seasons': ','.join(frag.seasons),
-                'occasions': ','.join(frag.occasions),
-                'sources': ','.join(frag.source_urls)
-            }
-            
-            # Process notes by category
-            for category in ['top', 'heart', 'base']:
-                category_notes = [n for n in frag.notes if n.category == category]
-                flat_data[f'{category}_notes'] = ','.join(n.name for n in category_notes)
-                flat_data[f'{category}_intensities'] = ','.join(
+            by_category = {category: [] for category in note_columns}
+            for n in frag.notes:
+                if n.category in by_category:
+                    by_category[n.category].append(n)
+            for category, (names, intensities) in note_columns.items():
+                category_notes = by_category[category]
+                names.append(','.join(n.name for n in category_notes))
+                intensities.append(','.join(
                     str(n.intensity) for n in category_notes if n.intensity is not None
-                )
-            
-            # Process ratings and accords
-            for rating_type, value in frag.ratings.items():
-                flat_data[f'rating_{rating_type}'] = value
-                
-            for accord, strength in frag.accords.items():
-                flat_data[f'accord_{accord}'] = strength
-                
-            # Process weather suitability
-            for weather, score in frag.weather_suitability.items():
-                flat_data[f'weather_{weather}'] = score
-                
-            processed_data.append(flat_data)
-            
-        df = pd.DataFrame(processed_data)
+                ))
+        for category, (names, intensities) in note_columns.items():
+            columns[f'{category}_notes'] = names
+            columns[f'{category}_intensities'] = intensities
+        
+        df = pd.DataFrame(columns)
+        
+        # Ratings, accords and weather suitability have per-fragrance keys:
+        # collect them as long (fragrance, column, value) rows and pivot once,
+        # so each key becomes a float column (in order of first appearance),
+        # NaN wherever a fragrance lacks it
+        frag_ids, keyed_columns, values = [], [], []
+        for i, frag in enumerate(data):
+            for prefix, mapping in [('rating', frag.ratings), ('accord', frag.accords), ('weather', frag.weather_suitability)]:
+                for key, value in mapping.items():
+                    frag_ids.append(i)
+                    keyed_columns.append(f'{prefix}_{key}')
+                    values.append(value)
+        if keyed_columns:
+            keyed = pd.DataFrame({
+                'frag_id': frag_ids,
+                'column': keyed_columns,
+                'value': np.array(values, dtype=float)
+            }).pivot(index='frag_id', columns='column', values='value')
+            keyed = keyed.reindex(index=df.index, columns=list(dict.fromkeys(keyed_columns)))
+            df = df.join(keyed.rename_axis(columns=None))
         
         # Add metadata
         df['scrape_date'] = datetime.now().isoformat()
@@ -247,32 +469,21 @@ class FragranceScraper:
         
         # Save data with timestamp
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        filename = f'fragrance_data_{timestamp}.json'
+        filename = f'fragrance_data_{timestamp}.jsonl'
         filepath = os.path.join(path, filename)
         
-        # Convert dataclass objects to dict
-        serializable_data = [
-            {
-                'name': d.name,
-                'brand': d.brand,
-                'release_year': d.release_year,
-                'notes': [{'name': n.name, 'category': n.category, 'intensity': n.intensity} 
-                         for n in d.notes],
-                'seasons': d.seasons,
-                'occasions': d.occasions,
-                'ratings': d.ratings,
-                'longevity': d.longevity,
-                'sillage': d.sillage,
-                'accords': d.accords,
-                'weather_suitability': d.weather_suitability,
-                'source_urls': d.source_urls
-            }
-            for d in data
-        ]
+        # One JSON object per line, encoded and written a record at a time in a
+        # worker thread: memory stays flat and the event loop is never blocked.
+        # The encoder reaches the dataclasses (FragranceData and its
+        # FragranceNotes) through default=vars, serializing each one's field
+        # dict in place instead of a copied snapshot
+        def write_records():
+            with open(filepath, 'w', encoding='utf-8') as f:
+                for d in data:
+                    f.write(json.dumps(d, default=vars))
+                    f.write('\n')
         
-        # Async file writing
-        async with aiofiles.open(filepath, 'w') as f:
-            await f.write(json.dumps(serializable_data, indent=2))
+        await asyncio.to_thread(write_records)
         
         logger.info(f"Raw data saved to {filepath}")
 
@@ -296,4 +507,4 @@ if __name__ == "__main__":
         df.to_csv('fragrance_data.csv', index=False)
         logger.info(f"Scraped data saved to fragrance_data.csv")
 
-    asyncio.run(main())
\ No newline at end of file
+    (uvloop.run if uvloop else asyncio.run)(main())
\ No newline at end of file
@@ -0,0 +1,26 @@
+import unittest
+
+from bs4 import BeautifulSoup
+
+from bn import REVIEW_BLOCKS, Scraper
+
+class ParseReviewTest(unittest.TestCase):
+    def parse(self, html):
+        soup = BeautifulSoup(html, 'lxml', parse_only=REVIEW_BLOCKS)
+        return Scraper().parse_review(soup.find('div', {'class': 'reviewblurb'}))
+
+    def test_strips_heading(self):
+        review = self.parse('<div class="reviewblurb"><h2><a href="/r/1">Aventus by Creed</a></h2>Smoky &amp; fresh<br>pineapple</div>')
+        self.assertEqual(review, {'perfume': 'Aventus', 'maker': 'Creed', 'review': 'Smoky &amp; fresh<br/>pineapple'})
+
+    def test_without_heading(self):
+        # No heading to strip, so the whole blurb is kept as the review
+        review = self.parse('<div class="reviewblurb"><a href="/r/2">Sauvage by Dior</a> Loud but versatile</div>')
+        self.assertEqual(review, {
+            'perfume': 'Sauvage',
+            'maker': 'Dior',
+            'review': '<a href="/r/2">Sauvage by Dior</a> Loud but versatile'
+        })
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,5 +1,9 @@
 import base64
+import os
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import numpy as np
 import pandas as pd
 from typing import List, Dict
 from pathlib import Path
@@ -23,9 +27,27 @@ USER_PROMPT = """Analyze this image and return a JSON object with cologne bottle
     ]
 }"""
 
+# Keep-alive session shared by every API call, so connections (and their TLS
+# handshakes) are reused; transient connection failures are retried with backoff
+_SESSION = requests.Session()
+_SESSION.mount('https://', HTTPAdapter(pool_connections=4, pool_maxsize=8, max_retries=Retry(total=3, backoff_factor=0.3)))
+
 def encode_image(image_path: str) -> str:
+    # Encode in chunks (a multiple of 3 bytes, so no padding mid-stream) to keep
+    # only one chunk of the raw image in memory at a time, straight into a buffer
+    # sized up front for the whole encoded image
     with open(image_path, "rb") as image_file:
-        return base64.b64encode(image_file.read()).decode('utf-8')
+        encoded = bytearray(4 * ((os.fstat(image_file.fileno()).st_size + 2) // 3))
+        position = 0
+        while chunk := image_file.read(57 * 1024):
+            piece = base64.b64encode(chunk)
+            # In place while it fits; grows the buffer if the file got longer
+            # after it was sized
+            encoded[position:position + len(piece)] = piece
+            position += len(piece)
+    # Only shrinks if the file got shorter while we read it
+    del encoded[position:]
+    return encoded.decode('ascii')
 
 def analyze_image(image_path: str, api_key: str) -> dict:
     base64_image = encode_image(image_path)
@@ -56,7 +78,7 @@ def analyze_image(image_path: str, api_key: str) -> dict:
         "response_format": { "type": "json_object" }
     }
     
-    response = requests.post(
+    response = _SESSION.post(
         "https://api.openai.com/v1/chat/completions",
         headers=headers,
         json=payload
@@ -73,6 +95,11 @@ class CologneRecognizer:
     def __init__(self, database_path: str):
         self.cologne_db = pd.read_csv(database_path)
         self.api_key = None
+        # Lowercased once: unique brands (with per-row codes) and perfume names
+        self._brand_names, self._brand_codes = np.unique(
+            self.cologne_db['brand'].str.lower().fillna('').to_numpy(dtype=str), return_inverse=True
+        )
+        self._perfume_lower = self.cologne_db['perfume'].str.lower().to_numpy(dtype=str)
 
     def analyze_image(self, image_path: str) -> List[Dict]:
         result = analyze_image(image_path, self.api_key)
@@ -82,16 +109,15 @@ class CologneRecognizer:
         matched_colognes = []
         
         for cologne in detected_colognes:
-            # Handle brand variations
+            # Handle brand variations: any brand term may appear in the DB brand
             brand_terms = cologne['brand'].lower().split()
-            brand_match = self.cologne_db['brand'].str.lower().apply(
-                lambda x: any(term in x for term in brand_terms)
-            )
+            brand_found = np.zeros(len(self._brand_names), dtype=bool)
+            for term in brand_terms:
+                brand_found |= np.char.find(self._brand_names, term) >= 0
+            brand_match = brand_found[self._brand_codes]
             
             # Match fragrance name
-            name_match = self.cologne_db['perfume'].str.contains(
-                cologne['name'], case=False, regex=False
-            )
+            name_match = np.char.find(self._perfume_lower, cologne['name'].lower()) >= 0
             
             match = self.cologne_db[brand_match & name_match]
             